@@ -3,6 +3,8 @@
     This file contains a program that runs two separate tasks that controls two motors:
     a positioning motor and a pusher motor. The program uses cotask.py and task_share.py
     to execute cooperative multi-tasking between these two task at different periods.
+    A third, lowest priority task streams the turret step response to the PC so that
+    serial writes never hold up the motor control tasks.
     The file was modified from basic_task.py from the ME405 library that was originally
     written by Dr. Ridgely.
 """
@@ -15,13 +17,16 @@ import utime
 from Encoder import Encoder
 from motor_driver import MotorDriver
 from controller import PController
+import telemetry
+from telemetry import Telemetry
 
 
 def motor_control():
     """!
     Task awaits a proportional gain to arrive over serial, and then drives a 12V Pololu 37Dx70L 50:1 Gear motor
     connected to a nerf turret term project 180 degrees using a closed loop proportional controller class.
-    The response is recorded and sent back over Serial to be plotted on a PC side GUI.
+    The response is queued on the telemetry object and sent back over Serial by telemetry_task to be
+    plotted on a PC side GUI.
     """
 
     statemc = 0
@@ -55,9 +60,6 @@ def motor_control():
                 # Rezero the encoder
                 coder.zero()
                 
-                # Create list of for storing time
-                timeVals = []
-                
                 # Create a list of position values
                 posVals = []
                 
@@ -69,64 +71,48 @@ def motor_control():
                 # Keep track of time with tzero
                 tzero = utime.ticks_ms()
                 
+                # Samples are streamed to the PC by the telemetry task as they are taken
+                telem.start()
+                
                 statemc = 2
             
         elif(statemc == 2):
-            try:
-                
             # Run motor controller step response
                
-                # read encoder
-                currentPos = coder.read()
-                
-                # Store values
-                posVals.append(currentPos)
-                timeVals.append(utime.ticks_ms()-tzero)
-                
-                # Run controller to get the pwm value
-                pwm = cntrlr.run(currentPos)
-                
-                
-                # Send signal to the motor
-                motor1.set_duty_cycle(-pwm)
-                
-                # Check if steady state was achieved
-                if(len(posVals) > lookback):
-                    
-                    for i in range(1, lookback+1):
-                        if(posVals[-i-1] == currentPos):
-                            if(i == lookback):
-                                # SS achieved, exit all loops
-                                statemc = 1
-                                motor1.set_duty_cycle(0)
-                                
-                                # Print csv values
-                                print("Start Data Transfer")
-                                print("Time [ms], Position [Encoder Ticks]")
-                                for i,num in enumerate(timeVals):
-                                    print(f'{num},{posVals[i]}')
-                                print("End")
-                                raise ValueError("Steady State Achieved")
-                        else:
-                            # SS not achieved, keep controlling that motor
-                            break
-                
-                # Check if we've ran longer than 5 seconds (infinite oscillation)
-                if(timeVals[-1] > 2000):
-                    statemc = 1
-                    motor1.set_duty_cycle(0)
-                    
-                    # Print csv values
-                    print("Start Data Transfer")
-                    print("Time [ms], Position [Encoder Ticks]")
-                    for i,num in enumerate(timeVals):
-                        print(f'{num},{posVals[i]}')
-                    print("End")
-                    raise ValueError("Steady State Timeout")
-                
-                    
-            except ValueError as e:
-                print(e)
+            # read encoder
+            currentPos = coder.read()
+            currentTime = utime.ticks_ms()-tzero
+            
+            # Store position for the steady state check and queue the sample for the telemetry task
+            posVals.append(currentPos)
+            telem.post(currentTime, currentPos)
+            
+            # Run controller to get the pwm value
+            pwm = cntrlr.run(currentPos)
+            
+            
+            # Send signal to the motor
+            motor1.set_duty_cycle(-pwm)
+            
+            # Check if steady state was achieved
+            if(len(posVals) > lookback):
+                
+                for i in range(1, lookback+1):
+                    if(posVals[-i-1] == currentPos):
+                        if(i == lookback):
+                            # SS achieved, stop the motor and end the data transfer
+                            statemc = 1
+                            motor1.set_duty_cycle(0)
+                            telem.end(telemetry.STEADY_STATE)
+                    else:
+                        # SS not achieved, keep controlling that motor
+                        break
+            
+            # Check if we've ran longer than 2 seconds (infinite oscillation)
+            if(statemc == 2 and currentTime > 2000):
+                statemc = 1
+                motor1.set_duty_cycle(0)
+                telem.end(telemetry.TIMEOUT)
         
         yield statemc
 
@@ -171,6 +157,18 @@ def pusher_control():
                 statepc = 1
 
         yield statepc
+
+def telemetry_task():
+    """!
+    Lowest priority task that drains queued telemetry records to the USB serial port. Writing is limited
+    to the time budget of the telemetry object each run, so the control tasks keep their deadlines
+    while data is being streamed.
+    """
+    
+    while True:
+        telem.drain()
+        
+        yield 0
 # This code creates a share, a queue, and two tasks, then starts the tasks. The
 # tasks run until somebody presses ENTER, at which time the scheduler stops and
 # printouts show diagnostic information about the tasks, share, and queue.
@@ -185,6 +183,10 @@ if __name__ == "__main__":
 #     q0 = task_share.Queue('L', 16, thread_protect=False, overwrite=False,
 #                           name="Queue 0")
             
+    # Create the telemetry queue shared by the producer tasks and the telemetry task.
+    # Room for 150 records, and at most 2ms of serial writes each time the telemetry task runs
+    telem = Telemetry(150, 2000, name="Telemetry Queue")
+            
     # Create the tasks. If trace is enabled for any task, memory will be
     # allocated for state transition tracing, and the application will run out
     # of memory after a while and quit. Therefore, use tracing only for 
@@ -196,8 +198,12 @@ if __name__ == "__main__":
     pusher_control = cotask.Task(pusher_control, name="Pusher Motor Control Task", priority=1, period=60,
                         profile=True, trace=False)
     
+    telemetry_task = cotask.Task(telemetry_task, name="Telemetry Task", priority=0, period=10,
+                        profile=True, trace=False)
+    
     cotask.task_list.append(motor_control)
     cotask.task_list.append(pusher_control)
+    cotask.task_list.append(telemetry_task)
 
     # Run the memory garbage collector to ensure memory is as defragmented as
     # possible before the real-time scheduler is started
@@ -213,5 +219,6 @@ if __name__ == "__main__":
     # Print a table of task data and a table of shared information data
     print('\n' + str (cotask.task_list))
     print(task_share.show_all())
+    print(f'Telemetry records dropped: {telem.overflows}')
     print(motor_control.get_trace())
     print('')
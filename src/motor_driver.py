@@ -47,8 +47,6 @@ class MotorDriver:
         or greater than 100 automatically saturate
         @param level A signed integer for the percent duty cycle sent to the motor. Ideally between -100 and 100.
         """
-        print (f"Setting duty cycle to {level}")
-        
         if level >= 0:
             # Forward Direction
             if level > 100:
@@ -0,0 +1,99 @@
+"""! @file telemetry.py
+This program contains a telemetry class that decouples serial output from the
+control tasks. Producer tasks post compact integer records into a preallocated
+task_share.Queue, and a low priority task drains the queue to the USB serial
+port within a fixed time budget each time it runs.
+"""
+import pyb
+import utime
+import task_share
+
+## Record tag marking the start of a step response data transfer
+START = -1
+## Record tag marking the end of a step response data transfer
+END = -2
+## End reason code for a response that reached steady state
+STEADY_STATE = 0
+## End reason code for a response that timed out
+TIMEOUT = 1
+
+class Telemetry:
+    """!
+    This class buffers step response data in a preallocated queue so that control
+    tasks never block on the serial port. Each record is two signed integers: a
+    time in milliseconds and an encoder position, or a negative tag and a
+    reason code for the start and end markers. Records that do not fit in the
+    queue are dropped and counted rather than raising an error.
+    """
+
+    def __init__(self, size, budget_us, name="Telemetry"):
+        """!
+        Creates the telemetry queue and the serial port used to send its contents.
+        @param size Number of records the queue can hold before overflowing.
+        @param budget_us Maximum time in microseconds spent writing per call to drain().
+        @param name Name of the queue shown in the task_share diagnostics.
+        """
+        # Each record takes two slots in the queue
+        self.slots = 2*size
+        self.queue = task_share.Queue('l', self.slots, thread_protect=False, overwrite=False,
+                                      name=name)
+        self.budget_us = budget_us
+        self.usbvcp = pyb.USB_VCP()
+
+        # Number of records dropped because the queue was full
+        self.overflows = 0
+
+    def post(self, first, second):
+        """!
+        Adds a record to the queue if there is room for it, otherwise counts it as an overflow.
+        Never blocks, so it is safe to call from inside a control loop.
+        @param first Time in milliseconds, or START/END for a marker record.
+        @param second Encoder position, or the end reason code for an END record.
+        @returns True if the record was queued, False if it was dropped.
+        """
+        if self.queue.num_in() > self.slots - 2:
+            self.overflows += 1
+            return False
+
+        self.queue.put(first)
+        self.queue.put(second)
+        return True
+
+    def start(self):
+        """!
+        Queues the marker that begins a step response data transfer.
+        """
+        self.post(START, 0)
+
+    def end(self, reason):
+        """!
+        Queues the marker that ends a step response data transfer.
+        @param reason STEADY_STATE or TIMEOUT, sent to the PC after the end line.
+        """
+        self.post(END, reason)
+
+    def drain(self):
+        """!
+        Writes queued records to the USB serial port in the csv format expected by gui.py
+        until the queue is empty or the time budget for this call has been used up.
+        """
+        tstart = utime.ticks_us()
+
+        while self.queue.any():
+            if utime.ticks_diff(utime.ticks_us(), tstart) >= self.budget_us:
+                break
+
+            first = self.queue.get()
+            second = self.queue.get()
+
+            if first == START:
+                self.usbvcp.write("Start Data Transfer\r\n")
+                self.usbvcp.write("Time [ms], Position [Encoder Ticks]\r\n")
+            elif first == END:
+                self.usbvcp.write("End\r\n")
+                if second == TIMEOUT:
+                    self.usbvcp.write("Steady State Timeout\r\n")
+                else:
+                    self.usbvcp.write("Steady State Achieved\r\n")
+            else:
+                self.usbvcp.write(f'{first},{second}\r\n')